@@ -1,8 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import Any, List, Dict
+from datetime import date
+from functools import lru_cache
+from typing import Any, AsyncIterator, List, Dict
 from pydantic_ai import Agent, ModelRetry, RunContext
 from pydantic_ai.models.openai import OpenAIModel
 
+@lru_cache(maxsize=1)
+def _today_str(ordinal: int) -> str:
+    return date.fromordinal(ordinal).strftime('%Y-%m-%d')
+
+def current_date_str() -> str:
+    """
+    Return today's date formatted as YYYY-MM-DD.
+    
+    The formatted string is cached per calendar day.
+    """
+    return _today_str(date.today().toordinal())
+
 class BaseAgent(ABC):
     def __init__(self, model: OpenAIModel):
         """
@@ -13,9 +27,11 @@ class BaseAgent(ABC):
         """
         self.agent = Agent(
             model,
-            system_prompt=self.get_system_prompt(),
             retries=2
         )
+        # Registered as a function so the prompt (and its date) is rebuilt on every
+        # run, since agents are cached and reused across days
+        self.agent.system_prompt(self.get_system_prompt)
     
     @abstractmethod
     def get_system_prompt(self) -> str:
@@ -39,4 +55,18 @@ class BaseAgent(ABC):
         Returns:
             The processed result
         """
+        pass
+    
+    @abstractmethod
+    def stream_query(self, query: str, context: Dict[str, Any] = None) -> AsyncIterator[str]:
+        """
+        Process a query, yielding the response text incrementally.
+        
+        Args:
+            query (str): The input query to process
+            context (Dict, optional): Additional context for processing
+        
+        Yields:
+            str: Chunks of the response text as the model produces them
+        """
         pass
\ No newline at end of file
@@ -1,182 +1,251 @@
 # src/agents/stock_analysis_agent.py
-from datetime import datetime
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
+import asyncio
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Optional
 
+from cachetools import TTLCache
 from httpx import AsyncClient
 import logfire
 from pydantic_ai.models.openai import OpenAIModel
+import yfinance as yf
 
-from src.agents.base_agent import BaseAgent
+from src.agents.base_agent import BaseAgent, current_date_str
 from src.tools.stock_analyzer_tool import FinancialDataFetcher, FinancialAnalyzer, CompetitiveAnalysis
 
+# Yahoo `info` payloads keyed by symbol, reused for 5 minutes
+_INFO_CACHE: TTLCache = TTLCache(maxsize=512, ttl=300)
+# Per-symbol locks so concurrent misses for the same ticker share one fetch
+_INFO_LOCKS: Dict[str, asyncio.Lock] = {}
+
+# Maps each report section's metrics to their Yahoo Finance `info` keys
+# None of these (nor the company name, industry and sector) are exposed by
+# Ticker.fast_info, which only covers price, volume and market cap data, so the
+# full `info` payload is the only source and is cached per symbol instead
+_ANALYSIS_SCHEMA: Dict[str, Dict[str, str]] = {
+    'valuation': {
+        'pe_ratio': 'trailingPE',
+        'forward_pe': 'forwardPE',
+        'peg_ratio': 'pegRatio',
+        'price_to_book': 'priceToBook',
+    },
+    'profitability': {
+        'operating_margin': 'operatingMargins',
+        'profit_margin': 'profitMargins',
+        'roe': 'returnOnEquity',
+        'roa': 'returnOnAssets',
+    },
+    'growth': {
+        'revenue_growth': 'revenueGrowth',
+        'earnings_growth': 'earningsGrowth',
+    },
+    'financial_health': {
+        'current_ratio': 'currentRatio',
+        'debt_to_equity': 'debtToEquity',
+        'free_cash_flow': 'freeCashflow',
+    },
+}
+
+# Markdown report rendered by StockAnalysisAgent._format_analysis_response
+REPORT_TEMPLATE = """\
+# Financial Analysis Report: {symbol}
+
+## Valuation Metrics
+
+| Metric | Value |
+|--------|--------|
+| P/E Ratio | {pe_ratio} |
+| Forward P/E | {forward_pe} |
+| PEG Ratio | {peg_ratio} |
+| Price to Book | {price_to_book} |
+
+
+## Profitability Metrics
+
+| Metric | Value |
+|--------|--------|
+| Operating Margin | {operating_margin} |
+| Profit Margin | {profit_margin} |
+| ROE | {roe} |
+| ROA | {roa} |
+
+
+## Growth Metrics
+
+| Metric | Value |
+|--------|--------|
+| Revenue Growth | {revenue_growth} |
+| Earnings Growth | {earnings_growth} |
+
+
+## Financial Health
+
+| Metric | Value |
+|--------|--------|
+| Current Ratio | {current_ratio} |
+| Debt to Equity | {debt_to_equity} |
+| Free Cash Flow | {free_cash_flow} |
+
+
+---
+*Disclaimer: This analysis is based on currently available data and should not be considered as financial advice. \
+Always conduct your own research and consult with financial professionals before making investment decisions.*"""
+
+def _fetch_info(symbol: str) -> Dict[str, Any]:
+    """Blocking fetch of the Yahoo Finance `info` dict"""
+    return yf.Ticker(symbol).info
+
+async def _get_info(symbol: str) -> Dict[str, Any]:
+    """Return the Yahoo Finance `info` dict for a symbol, using the TTL cache"""
+    key = symbol.upper()
+    info = _INFO_CACHE.get(key)
+    if info is not None:
+        return info
+
+    lock = _INFO_LOCKS.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            # Another task may have filled the cache while we were waiting
+            info = _INFO_CACHE.get(key)
+            if info is None:
+                info = await asyncio.to_thread(_fetch_info, symbol)
+                if info:
+                    _INFO_CACHE[key] = info
+            return info
+    finally:
+        if not lock.locked() and _INFO_LOCKS.get(key) is lock:
+            del _INFO_LOCKS[key]
+
+@lru_cache(maxsize=1)
+def _system_prompt(today: str) -> str:
+    return (
+        f"You are an expert financial analyst specializing in comprehensive stock analysis. "
+        f"You help users understand companies through fundamental analysis, competitive positioning, "
+        f"and market dynamics. You provide detailed insights while making complex financial "
+        f"concepts accessible. The current date is: {today}"
+    )
+
 class StockAnalysisAgent(BaseAgent):
     def __init__(self, model: OpenAIModel):
         super().__init__(model)
         
-        @self.agent.tool
-        async def analyze_stock(
-            ctx, 
-            symbol: str,
-            analysis_type: str = "full"  # full, fundamental, competitive, technical
-        ) -> str:
-            """Perform comprehensive stock analysis"""
-            try:
-                import yfinance as yf
-                
-                # Fetch data
-                stock = yf.Ticker(symbol)
-                info = stock.info
-                
-                # Basic validation
-                if not info:
-                    return f"Could not fetch data for symbol {symbol}"
-                
-                analysis = {
-                    'valuation': {
-                        'pe_ratio': info.get('trailingPE', 'N/A'),
-                        'forward_pe': info.get('forwardPE', 'N/A'),
-                        'peg_ratio': info.get('pegRatio', 'N/A'),
-                        'price_to_book': info.get('priceToBook', 'N/A'),
-                    },
-                    'profitability': {
-                        'operating_margin': info.get('operatingMargins', 'N/A'),
-                        'profit_margin': info.get('profitMargins', 'N/A'),
-                        'roe': info.get('returnOnEquity', 'N/A'),
-                        'roa': info.get('returnOnAssets', 'N/A'),
-                    },
-                    'growth': {
-                        'revenue_growth': info.get('revenueGrowth', 'N/A'),
-                        'earnings_growth': info.get('earningsGrowth', 'N/A'),
-                    },
-                    'financial_health': {
-                        'current_ratio': info.get('currentRatio', 'N/A'),
-                        'debt_to_equity': info.get('debtToEquity', 'N/A'),
-                        'free_cash_flow': info.get('freeCashflow', 'N/A'),
-                    }
-                }
-                
-                # Store analysis in context for visualization
-                if ctx.deps.context is not None:
-                    ctx.deps.context['analysis'] = analysis
-                    ctx.deps.context['company_info'] = {
-                        'name': info.get('longName', symbol),
-                        'industry': info.get('industry', 'N/A'),
-                        'sector': info.get('sector', 'N/A'),
-                        'ticker': symbol,
-                        'symbol': symbol
-                    }
-                
-                return self._format_analysis_response(symbol, analysis)
-                
-            except Exception as e:
-                return f"Error analyzing stock: {str(e)}"
+        # Bound method registered as-is; pydantic_ai sees (ctx, symbol, analysis_type)
+        self.agent.tool(self.analyze_stock)
     
-    def get_system_prompt(self) -> str:
-        return (
-            f"You are an expert financial analyst specializing in comprehensive stock analysis. "
-            f"You help users understand companies through fundamental analysis, competitive positioning, "
-            f"and market dynamics. You provide detailed insights while making complex financial "
-            f"concepts accessible. The current date is: {datetime.now().strftime('%Y-%m-%d')}"
-        )
+    async def analyze_stock(
+        self,
+        ctx, 
+        symbol: str,
+        analysis_type: str = "full"  # full, fundamental, competitive, technical
+    ) -> str:
+        """Perform comprehensive stock analysis"""
+        try:
+            # Fetch data
+            info = await _get_info(symbol)
+
+            # Basic validation
+            if not info:
+                return f"Could not fetch data for symbol {symbol}"
+
+            analysis = {
+                section: {key: info.get(yahoo_key, 'N/A') for key, yahoo_key in fields.items()}
+                for section, fields in _ANALYSIS_SCHEMA.items()
+            }
+
+            # Store analysis in context for visualization
+            ctx.deps['analysis'] = analysis
+            ctx.deps['company_info'] = {
+                'name': info.get('longName', symbol),
+                'industry': info.get('industry', 'N/A'),
+                'sector': info.get('sector', 'N/A'),
+                'ticker': symbol,
+                'symbol': symbol
+            }
+
+            return self._format_analysis_response(symbol, analysis)
+
+        except Exception as e:
+            return f"Error analyzing stock: {str(e)}"
     
-    @dataclass
-    class Deps:
-        context: Dict[str, Any] | None = None
+    def get_system_prompt(self) -> str:
+        return _system_prompt(current_date_str())
     
     async def process_query(self, query: str, context: Dict[str, Any] = None):
         """Process a stock analysis query"""
-        deps = self.Deps(context=context or {})
+        # The context dict itself is the run's deps; the tool writes its results into it
+        deps = context if context is not None else {}
         
         with logfire.span('Stock Analysis Agent', query=query):
             result = await self.agent.run(query, deps=deps)
             
             return {
                 'response': result.data,
-                'analysis_data': deps.context.get('analysis'),
-                'company_info': deps.context.get('company_info')
+                'analysis_data': deps.get('analysis'),
+                'company_info': deps.get('company_info')
             }
 
-    def _format_analysis_response(self, symbol: str, analysis: Dict[str, Any]) -> str:
-        """Format analysis results into a well-structured markdown response"""
-        markdown = [f"# Financial Analysis Report: {symbol}\n"]
-        
-        # Valuation Section
-        markdown.extend([
-            "## Valuation Metrics\n",
-            "| Metric | Value |",
-            "|--------|--------|",
-            f"| P/E Ratio | {self._format_number(analysis['valuation'].get('pe_ratio'))} |",
-            f"| Forward P/E | {self._format_number(analysis['valuation'].get('forward_pe'))} |",
-            f"| PEG Ratio | {self._format_number(analysis['valuation'].get('peg_ratio'))} |",
-            f"| Price to Book | {self._format_number(analysis['valuation'].get('price_to_book'))} |",
-            "\n"
-        ])
+    async def stream_query(self, query: str, context: Dict[str, Any] = None) -> AsyncIterator[str]:
+        """
+        Process a stock analysis query, yielding response text as it is generated.
         
-        # Profitability Section
-        markdown.extend([
-            "## Profitability Metrics\n",
-            "| Metric | Value |",
-            "|--------|--------|",
-            f"| Operating Margin | {self._format_percentage(analysis['profitability'].get('operating_margin'))} |",
-            f"| Profit Margin | {self._format_percentage(analysis['profitability'].get('profit_margin'))} |",
-            f"| ROE | {self._format_percentage(analysis['profitability'].get('roe'))} |",
-            f"| ROA | {self._format_percentage(analysis['profitability'].get('roa'))} |",
-            "\n"
-        ])
+        Pass a context dict to receive the 'analysis' and 'company_info' entries
+        written by the analyze_stock tool.
+        """
+        deps = context if context is not None else {}
         
-        # Growth Section
-        markdown.extend([
-            "## Growth Metrics\n",
-            "| Metric | Value |",
-            "|--------|--------|",
-            f"| Revenue Growth | {self._format_percentage(analysis['growth'].get('revenue_growth'))} |",
-            f"| Earnings Growth | {self._format_percentage(analysis['growth'].get('earnings_growth'))} |",
-            "\n"
-        ])
-        
-        # Financial Health Section
-        markdown.extend([
-            "## Financial Health\n",
-            "| Metric | Value |",
-            "|--------|--------|",
-            f"| Current Ratio | {self._format_number(analysis['financial_health'].get('current_ratio'))} |",
-            f"| Debt to Equity | {self._format_number(analysis['financial_health'].get('debt_to_equity'))} |",
-            f"| Free Cash Flow | {self._format_currency(analysis['financial_health'].get('free_cash_flow'))} |",
-            "\n"
-        ])
-
-        # Add disclaimer
-        markdown.extend([
-            "---",
-            "*Disclaimer: This analysis is based on currently available data and should not be considered as financial advice. "
-            "Always conduct your own research and consult with financial professionals before making investment decisions.*"
-        ])
-
-        return "\n".join(markdown)
+        with logfire.span('Stock Analysis Agent', query=query):
+            async with self.agent.run_stream(query, deps=deps) as result:
+                async for chunk in result.stream_text(delta=True):
+                    yield chunk
+
+    def _format_analysis_response(self, symbol: str, analysis: Dict[str, Any]) -> str:
+        """Format analysis results into a well-structured markdown response"""
+        v, p, g, fh = (
+            analysis['valuation'],
+            analysis['profitability'],
+            analysis['growth'],
+            analysis['financial_health'],
+        )
+        return REPORT_TEMPLATE.format(
+            symbol=symbol,
+            pe_ratio=self._format_number(v.get('pe_ratio')),
+            forward_pe=self._format_number(v.get('forward_pe')),
+            peg_ratio=self._format_number(v.get('peg_ratio')),
+            price_to_book=self._format_number(v.get('price_to_book')),
+            operating_margin=self._format_percentage(p.get('operating_margin')),
+            profit_margin=self._format_percentage(p.get('profit_margin')),
+            roe=self._format_percentage(p.get('roe')),
+            roa=self._format_percentage(p.get('roa')),
+            revenue_growth=self._format_percentage(g.get('revenue_growth')),
+            earnings_growth=self._format_percentage(g.get('earnings_growth')),
+            current_ratio=self._format_number(fh.get('current_ratio')),
+            debt_to_equity=self._format_number(fh.get('debt_to_equity')),
+            free_cash_flow=self._format_currency(fh.get('free_cash_flow')),
+        )
+
+    @staticmethod
+    def _coerce(value: Any) -> Optional[float]:
+        """Return value if it is numeric, None for 'N/A', None or anything else"""
+        return value if isinstance(value, (int, float)) else None
 
     def _format_percentage(self, value: Optional[float]) -> str:
         """Format number as percentage"""
-        if value is None or value == 'N/A':
-            return "N/A"
-        return f"{value*100:.2f}%" if isinstance(value, (int, float)) else "N/A"
+        n = self._coerce(value)
+        return "N/A" if n is None else f"{n*100:.2f}%"
 
     def _format_number(self, value: Optional[float]) -> str:
         """Format number with 2 decimal places"""
-        if value is None or value == 'N/A':
-            return "N/A"
-        return f"{value:.2f}" if isinstance(value, (int, float)) else "N/A"
+        n = self._coerce(value)
+        return "N/A" if n is None else f"{n:.2f}"
 
     def _format_currency(self, value: Optional[float]) -> str:
         """Format number as currency in millions/billions"""
-        if value is None or value == 'N/A':
-            return "N/A"
-        if not isinstance(value, (int, float)):
+        n = self._coerce(value)
+        if n is None:
             return "N/A"
         
-        if abs(value) >= 1e9:
-            return f"${value/1e9:.2f}B"
-        elif abs(value) >= 1e6:
-            return f"${value/1e6:.2f}M"
+        if abs(n) >= 1e9:
+            return f"${n/1e9:.2f}B"
+        elif abs(n) >= 1e6:
+            return f"${n/1e6:.2f}M"
         else:
-            return f"${value:.2f}"
\ No newline at end of file
+            return f"${n:.2f}"
\ No newline at end of file
@@ -1,14 +1,21 @@
-from datetime import datetime
 from dataclasses import dataclass
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List
 
 from httpx import AsyncClient
 import logfire
 
-from src.agents.base_agent import BaseAgent
-from src.tools.web_search import WebSearchTool
+from src.agents.base_agent import BaseAgent, current_date_str
+from src.tools.web_search import WebSearchTool, get_http_client
 from src.config import settings
 
+@lru_cache(maxsize=1)
+def _system_prompt(today: str) -> str:
+    return (
+        f"You are an expert at researching the web to answer user questions. "
+        f"The current date is: {today}"
+    )
+
 class WebSearchAgent(BaseAgent):
     def __init__(self, model):
         super().__init__(model)
@@ -21,14 +28,24 @@ class WebSearchAgent(BaseAgent):
                 web_query, 
                 ctx.deps.brave_api_key
             )
+        
+        @self.agent.tool
+        async def search_web_many(ctx, web_queries: List[str]) -> str:
+            """Run several related web searches at once and return all of their results"""
+            results = await WebSearchTool.search_many(
+                ctx.deps.client, 
+                web_queries, 
+                ctx.deps.brave_api_key
+            )
+            return "\n".join(
+                f"Results for '{query}':\n{result}"
+                for query, result in zip(web_queries, results)
+            )
     
     def get_system_prompt(self) -> str:
-        return (
-            f"You are an expert at researching the web to answer user questions. "
-            f"The current date is: {datetime.now().strftime('%Y-%m-%d')}"
-        )
+        return _system_prompt(current_date_str())
     
-    @dataclass
+    @dataclass(slots=True)
     class Deps:
         client: AsyncClient
         brave_api_key: str | None
@@ -44,12 +61,25 @@ class WebSearchAgent(BaseAgent):
         Returns:
             Search results or processed information
         """
-        async with AsyncClient() as client:
-            deps = self.Deps(
-                client=client, 
-                brave_api_key=settings.BRAVE_API_KEY
-            )
-            
-            with logfire.span('Web Search Agent', query=query):
-                result = await self.agent.run(query, deps=deps)
-                return result.data
\ No newline at end of file
+        client = get_http_client()
+        deps = self.Deps(
+            client=client, 
+            brave_api_key=settings.BRAVE_API_KEY
+        )
+        
+        with logfire.span('Web Search Agent', query=query):
+            result = await self.agent.run(query, deps=deps)
+            return result.data
+
+    async def stream_query(self, query: str, context: Dict[str, Any] = None) -> AsyncIterator[str]:
+        """Process a web search query, yielding response text as it is generated"""
+        client = get_http_client()
+        deps = self.Deps(
+            client=client, 
+            brave_api_key=settings.BRAVE_API_KEY
+        )
+        
+        with logfire.span('Web Search Agent', query=query):
+            async with self.agent.run_stream(query, deps=deps) as result:
+                async for chunk in result.stream_text(delta=True):
+                    yield chunk
@@ -2,7 +2,7 @@ import os
 from enum import Enum
 import asyncio
 import streamlit as st
-from typing import Dict, Type, Optional
+from typing import Any, AsyncIterator, Dict, Type, Optional
 
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.messages import UserPrompt, ModelTextResponse
@@ -34,6 +34,17 @@ class AgentManager:
         agent_class = self.agents[agent_type]
         return agent_class(model)
 
+@st.cache_resource(show_spinner=False)
+def _get_agent(model_name: str, agent_type: AgentType) -> BaseAgent:
+    """Build the selected agent once per (model, agent type) and reuse it across reruns"""
+    agent_manager = AgentManager()
+    
+    # Create Ollama client and model
+    ollama_client = create_ollama_client(model_name)
+    model = OpenAIModel(model_name, openai_client=ollama_client)
+    
+    return agent_manager.initialize_agent(agent_type, model)
+
 def initialize_session_state():
     if "messages" not in st.session_state:
         st.session_state.messages = []
@@ -67,12 +78,11 @@ def render_sidebar():
     
     return brave_api_key, selected_model, selected_agent
 
-async def process_message(agent: BaseAgent, message: str):
-    try:
-        return await agent.process_query(message)
-    except Exception as e:
-        st.error(f"Error processing message: {str(e)}")
-        return f"Error: {str(e)}"
+async def process_message(agent: BaseAgent, message: str, context: Dict[str, Any]) -> AsyncIterator[str]:
+    # Runs on the UI's background event loop, where Streamlit elements can't be
+    # drawn, so errors propagate to the caller to be displayed there
+    async for chunk in agent.stream_query(message, context):
+        yield chunk
 
 def main():
     # Initialize UI
@@ -88,15 +98,8 @@ def main():
     if not selected_model:
         return
     
-    # Initialize agent manager
-    agent_manager = AgentManager()
-    
-    # Create Ollama client and model
-    ollama_client = create_ollama_client(selected_model)
-    model = OpenAIModel(selected_model, openai_client=ollama_client)
-    
     # Initialize the selected agent
-    current_agent = agent_manager.initialize_agent(selected_agent, model)
+    current_agent = _get_agent(selected_model, selected_agent)
     
     # Pass agent to UI for processing
     ui.render(current_agent, process_message, selected_model)
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+class FileCache:
+    """
+    Small on-disk JSON cache with a fixed time-to-live per entry.
+    
+    Methods do blocking file I/O; call them via asyncio.to_thread from async code.
+    """
+    
+    def __init__(self, directory: str = '.cache/brave', ttl: float = 3600):
+        """
+        Args:
+            directory (str): Directory holding one JSON file per cached key
+            ttl (float): Seconds an entry stays valid after being stored
+        """
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self._last_prune = 0.0
+    
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{hashlib.md5(key.encode()).hexdigest()}.json"
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached payload for key, or None if missing or expired"""
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if time.time() - entry.get('ts', 0) > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        return entry.get('payload')
+    
+    def set(self, key: str, payload: Any) -> None:
+        """Store a JSON-serializable payload under key"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            # Write then rename so readers never see a partially written file
+            tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'ts': time.time(), 'payload': payload}, f)
+            os.replace(tmp_path, path)
+            self._prune()
+        except OSError:
+            # Caching is best-effort; a read-only filesystem shouldn't break search
+            pass
+    
+    def _prune(self) -> None:
+        """Delete expired entries and stale temp files, at most once per ttl"""
+        now = time.time()
+        if now - self._last_prune < self.ttl:
+            return
+        self._last_prune = now
+        
+        # A file's mtime is when it was written, so it expires with its entry
+        for path in self.directory.iterdir():
+            try:
+                if now - path.stat().st_mtime > self.ttl:
+                    path.unlink()
+            except OSError:
+                pass
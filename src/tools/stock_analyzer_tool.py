@@ -1,3 +1,5 @@
+import asyncio
+import bisect
 from typing import Optional, Dict, Any, List
 from httpx import AsyncClient
 import pandas as pd
@@ -7,6 +9,14 @@ import pandas_ta as ta
 from bs4 import BeautifulSoup
 import json
 
+# Lower bounds of each market cap tier above Micro Cap, paired with _CAP_LABELS
+_CAP_THRESHOLDS = (300e6, 2e9, 10e9, 200e9)
+_CAP_LABELS = ("Micro Cap", "Small Cap", "Mid Cap", "Large Cap", "Mega Cap")
+
+def _frame_or_empty(frame: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """Return frame, or an empty DataFrame when yfinance has no data"""
+    return frame if frame is not None else pd.DataFrame()
+
 class FinancialDataFetcher:
     """Fetches financial data from multiple sources"""
     
@@ -15,24 +25,62 @@ class FinancialDataFetcher:
         """Fetch comprehensive data from Yahoo Finance"""
         try:
             stock = yf.Ticker(symbol)
+        except Exception as e:
+            return {'status': 'error', 'error': str(e)}
+        return await FinancialDataFetcher._fetch_ticker_data(stock)
+
+    @staticmethod
+    async def get_yahoo_data_batch(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch comprehensive Yahoo Finance data for several symbols concurrently"""
+        try:
+            # A list is used as-is, whereas a joined string would be re-split on spaces and commas
+            tickers = await asyncio.to_thread(yf.Tickers, list(symbols))
+        except Exception as e:
+            return {symbol: {'status': 'error', 'error': str(e)} for symbol in symbols}
+        
+        async def fetch(symbol: str) -> Dict[str, Any]:
+            stock = tickers.tickers.get(symbol.upper())
+            if stock is None:
+                return {'status': 'error', 'error': f"No ticker created for symbol {symbol!r}"}
+            return await FinancialDataFetcher._fetch_ticker_data(stock)
+        
+        results = await asyncio.gather(*(fetch(symbol) for symbol in symbols))
+        return dict(zip(symbols, results))
+
+    @staticmethod
+    async def _fetch_ticker_data(stock: yf.Ticker) -> Dict[str, Any]:
+        """Fetch all data for an already constructed Ticker"""
+        try:
+            # Each attribute is a separate blocking request, so issue them concurrently
+            (
+                info,
+                financials,
+                balance_sheet,
+                cash_flow,
+                earnings,
+                institutional_holders,
+                recommendations,
+            ) = await asyncio.gather(
+                asyncio.to_thread(getattr, stock, 'info'),
+                asyncio.to_thread(getattr, stock, 'financials'),
+                asyncio.to_thread(getattr, stock, 'balance_sheet'),
+                asyncio.to_thread(getattr, stock, 'cashflow'),
+                asyncio.to_thread(getattr, stock, 'earnings'),
+                asyncio.to_thread(getattr, stock, 'institutional_holders'),
+                asyncio.to_thread(getattr, stock, 'recommendations'),
+            )
             
-            # Get all available data
-            info = stock.info
-            financials = stock.financials
-            balance_sheet = stock.balance_sheet
-            cash_flow = stock.cashflow
-            earnings = stock.earnings
-            institutional_holders = stock.institutional_holders
-            recommendations = stock.recommendations
-            
+            # Statements are returned as DataFrames (empty when unavailable, e.g. the
+            # deprecated `earnings`, which is always None) so callers can use .empty and
+            # .loc directly instead of paying for a nested to_dict() conversion
             return {
                 'info': info,
-                'financials': financials.to_dict() if not financials.empty else {},
-                'balance_sheet': balance_sheet.to_dict() if not balance_sheet.empty else {},
-                'cash_flow': cash_flow.to_dict() if not cash_flow.empty else {},
-                'earnings': earnings.to_dict() if not earnings.empty else {},
-                'institutional_holders': institutional_holders.to_dict() if institutional_holders is not None and not institutional_holders.empty else {},
-                'recommendations': recommendations.to_dict() if recommendations is not None and not recommendations.empty else {},
+                'financials': _frame_or_empty(financials),
+                'balance_sheet': _frame_or_empty(balance_sheet),
+                'cash_flow': _frame_or_empty(cash_flow),
+                'earnings': _frame_or_empty(earnings),
+                'institutional_holders': _frame_or_empty(institutional_holders),
+                'recommendations': _frame_or_empty(recommendations),
                 'status': 'success'
             }
         except Exception as e:
@@ -152,18 +200,10 @@ class CompetitiveAnalysis:
     
     @staticmethod
     def _categorize_market_cap(market_cap: float) -> str:
-        if market_cap is None:
+        # NaN compares false against every threshold and would bisect into the top tier
+        if market_cap is None or market_cap != market_cap:
             return "Unknown"
-        elif market_cap >= 200e9:
-            return "Mega Cap"
-        elif market_cap >= 10e9:
-            return "Large Cap"
-        elif market_cap >= 2e9:
-            return "Mid Cap"
-        elif market_cap >= 300e6:
-            return "Small Cap"
-        else:
-            return "Micro Cap"
+        return _CAP_LABELS[bisect.bisect_right(_CAP_THRESHOLDS, market_cap)]
     
     @staticmethod
     def _analyze_competitive_advantages(data: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -1,6 +1,52 @@
-from typing import Optional
+import asyncio
+import atexit
+import weakref
+from typing import List, Optional
+import httpx
 from httpx import AsyncClient
 
+from src.tools._search_cache import FileCache
+
+# Brave responses keyed by query, kept on disk for an hour
+_search_cache = FileCache()
+
+# One client per event loop, since a client's connection pool binds to the loop it runs on
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncClient]" = weakref.WeakKeyDictionary()
+
+def get_http_client() -> AsyncClient:
+    """
+    Return the HTTP client used for web searches on the running event loop.
+    
+    The client keeps HTTP/2 connections alive between searches made on the same
+    loop, such as the UI's persistent background loop. Each new loop (for
+    example every asyncio.run call) gets its own client.
+    """
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _http_clients[loop] = AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            headers={'Accept-Encoding': 'gzip'}
+        )
+    return client
+
+def _close_http_clients():
+    """Close the HTTP clients of loops that are still usable on interpreter shutdown"""
+    for loop, client in list(_http_clients.items()):
+        if client.is_closed or loop.is_closed():
+            continue
+        try:
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+            else:
+                loop.run_until_complete(client.aclose())
+        except Exception:
+            pass
+
+atexit.register(_close_http_clients)
+
 class WebSearchTool:
     @staticmethod
     async def search(
@@ -25,21 +71,25 @@ class WebSearchTool:
         headers = {
             'X-Subscription-Token': brave_api_key,
             'Accept': 'application/json',
+            'Accept-Encoding': 'gzip',
         }
         
         try:
-            r = await client.get(
-                'https://api.search.brave.com/res/v1/web/search',
-                params={
-                    'q': query,
-                    'count': 5,
-                    'text_decorations': True,
-                    'search_lang': 'en'
-                },
-                headers=headers
-            )
-            r.raise_for_status()
-            data = r.json()
+            data = await asyncio.to_thread(_search_cache.get, query)
+            if data is None:
+                r = await client.get(
+                    'https://api.search.brave.com/res/v1/web/search',
+                    params={
+                        'q': query,
+                        'count': 5,
+                        'text_decorations': True,
+                        'search_lang': 'en'
+                    },
+                    headers=headers
+                )
+                r.raise_for_status()
+                data = r.json()
+                await asyncio.to_thread(_search_cache.set, query, data)
 
             results = []
             web_results = data.get('web', {}).get('results', [])
@@ -53,4 +103,35 @@ class WebSearchTool:
             return "\n".join(results) if results else "No results found for the query."
         
         except Exception as e:
-            return f"Web search error: {str(e)}"
\ No newline at end of file
+            return f"Web search error: {str(e)}"
+
+    @staticmethod
+    async def search_many(
+        client: AsyncClient, 
+        queries: List[str], 
+        brave_api_key: Optional[str] = None,
+        max_concurrency: int = 5
+    ) -> List[str]:
+        """
+        Perform several web searches concurrently.
+        
+        Args:
+            client (AsyncClient): HTTP client for making requests
+            queries (List[str]): Search queries
+            brave_api_key (Optional[str]): Brave Search API key
+            max_concurrency (int): Maximum number of requests in flight at once
+        
+        Returns:
+            List[str]: Formatted search results, in the same order as queries
+        """
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def _one(query: str) -> str:
+            async with sem:
+                return await WebSearchTool.search(client, query, brave_api_key)
+
+        results = await asyncio.gather(*(_one(q) for q in queries), return_exceptions=True)
+        return [
+            f"Web search error: {str(r)}" if isinstance(r, BaseException) else r
+            for r in results
+        ]
\ No newline at end of file
@@ -1,12 +1,19 @@
 # src/ui/streamlit_app.py
 import streamlit as st
 import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 import yfinance as yf
-from typing import List, Optional, Callable, Any, Dict
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from typing import List, Optional, Callable, Any, AsyncIterator, Dict, Iterator, Tuple
 
 # Configure page
 st.set_page_config(
@@ -16,140 +23,281 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-class StockPriceTracker:
-    @staticmethod
-    def get_live_price(symbol: str) -> Dict[str, Any]:
-        """Get live stock price data"""
-        stock = yf.Ticker(symbol)
-        try:
-            today_data = stock.history(period='1d', interval='1m')
-            if not today_data.empty:
-                current_price = today_data['Close'].iloc[-1]
-                open_price = today_data['Open'].iloc[0]
-                price_change = current_price - open_price
-                price_change_pct = (price_change / open_price) * 100
-                
-                return {
-                    'current_price': current_price,
-                    'price_change': price_change,
-                    'price_change_pct': price_change_pct,
-                    'volume': today_data['Volume'].sum(),
-                    'high': today_data['High'].max(),
-                    'low': today_data['Low'].min(),
-                }
-        except Exception as e:
-            st.error(f"Error fetching live price: {str(e)}")
+# Figures are serialized with plotly.io.to_json when sent to the browser;
+# orjson encodes the large OHLCV arrays much faster than the stdlib encoder
+pio.json.config.default_engine = 'orjson'
+pio.templates.default = 'plotly_dark'
+
+@st.cache_resource
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """Start one background event loop that lives for the whole process"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+# Longest wait in seconds for the next streamed chunk before giving up
+_STREAM_TIMEOUT = 120
+
+def _iter_async(agen: AsyncIterator[str]) -> Iterator[str]:
+    """Drive an async generator on the background loop, yielding its items synchronously"""
+    loop = _get_event_loop()
+    cancelled = False
+    try:
+        while True:
+            future = asyncio.run_coroutine_threadsafe(agen.__anext__(), loop)
+            # Waiting separately keeps a stall apart from a TimeoutError raised by the
+            # generator itself. cancel() only succeeds while the step is still pending;
+            # it then unwinds and closes the generator on the loop
+            wait((future,), timeout=_STREAM_TIMEOUT)
+            if future.cancel():
+                cancelled = True
+                raise TimeoutError(f"No response received within {_STREAM_TIMEOUT} seconds")
+            try:
+                chunk = future.result()
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        if not cancelled:
+            asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result(timeout=_STREAM_TIMEOUT)
+
+@st.cache_resource(max_entries=128, ttl=3600, show_spinner=False)
+def _get_ticker(symbol: str) -> yf.Ticker:
+    """Share one Ticker per symbol so its HTTP session and fetched info are reused"""
+    return yf.Ticker(symbol)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_live_price(symbol: str) -> Optional[Dict[str, Any]]:
+    """Get live stock price data"""
+    stock = _get_ticker(symbol)
+    try:
+        today_data = stock.history(period='1d', interval='1m')
+        if not today_data.empty:
+            current_price = today_data['Close'].iloc[-1]
+            open_price = today_data['Open'].iloc[0]
+            price_change = current_price - open_price
+            price_change_pct = (price_change / open_price) * 100
+
+            return {
+                'current_price': current_price,
+                'price_change': price_change,
+                'price_change_pct': price_change_pct,
+                'volume': today_data['Volume'].sum(),
+                'high': today_data['High'].max(),
+                'low': today_data['Low'].min(),
+            }
+    except Exception as e:
+        st.error(f"Error fetching live price: {str(e)}")
+    return None
+
+# Market cap display units, largest first
+_MARKET_CAP_UNITS = ((1e12, 'T'), (1e9, 'B'), (1e6, 'M'))
+
+def _format_market_cap(market_cap: float) -> str:
+    """Format a market cap as dollars in trillions/billions/millions"""
+    for divisor, suffix in _MARKET_CAP_UNITS:
+        if market_cap >= divisor:
+            return f"${market_cap/divisor:.2f}{suffix}"
+    return f"${market_cap/1e6:.2f}M"
+
+# Float formats by metric category, see _metric_category
+_METRIC_FORMATS = {'ratio': '{:.2f}', 'pct': '{:.2%}', 'money': '{:,.2f}'}
+
+@lru_cache(maxsize=256)
+def _metric_category(key: str) -> str:
+    """Classify a metric key by name; ratios and margins win over growth and returns"""
+    k = key.lower()
+    if 'ratio' in k or 'margin' in k:
+        return 'ratio'
+    if 'growth' in k or 'return' in k:
+        return 'pct'
+    return 'money'
+
+def _format_metric(key: str, value: Any) -> str:
+    """Format a metric value for display in the metrics tables"""
+    if isinstance(value, float):
+        return _METRIC_FORMATS[_metric_category(key)].format(value)
+    return str(value)
+
+# Chart periods offered in the selector and the bar interval used for each
+_PERIODS = ("1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "max")
+_INTERVALS = {
+    "1d": "1m",
+    "5d": "5m",
+    "1mo": "1h",
+    "3mo": "1d",
+    "6mo": "1d",
+    "1y": "1d",
+    "2y": "1d",
+    "5y": "1wk",
+    "max": "1mo"
+}
+
+@st.cache_data(ttl=900, show_spinner=False)
+def _fetch_history(symbol: str, period: str, interval: str) -> pd.DataFrame:
+    """Download OHLCV history for a symbol"""
+    return _get_ticker(symbol).history(period=period, interval=interval)
+
+def _moving_averages(close: np.ndarray, windows: Tuple[int, ...]) -> List[np.ndarray]:
+    """
+    Simple moving averages for several windows from one cumulative sum.
+    
+    Matches Series.rolling(window).mean(): the first window - 1 values, and
+    any window containing a NaN, are NaN.
+    """
+    missing = np.isnan(close)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, close))))
+    gaps = np.concatenate(([0], np.cumsum(missing)))
+    averages = []
+    for n in windows:
+        ma = np.full(len(close), np.nan)
+        if len(close) >= n:
+            window_ma = (sums[n:] - sums[:-n]) / n
+            window_ma[(gaps[n:] - gaps[:-n]) > 0] = np.nan
+            ma[n - 1:] = window_ma
+        averages.append(ma)
+    return averages
+
+# cache_resource hands back the same Figure on a hit, where cache_data would unpickle
+# a copy and re-run every Plotly validator. Keying on (symbol, period) also avoids
+# hashing the history frame on each rerun. st.plotly_chart only serializes the figure.
+@st.cache_resource(max_entries=128, ttl=900, show_spinner=False)
+def _build_figure(symbol: str, period: str) -> Optional[go.Figure]:
+    """Build the candlestick, moving average and volume figure, or None without history"""
+    hist = _fetch_history(symbol, period, _INTERVALS.get(period, "1d"))
+    if hist.empty:
+        return None
+
+    fig = make_subplots(
+        rows=2, cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.03,
+        row_heights=[0.7, 0.3],
+        subplot_titles=('Price', 'Volume')
+    )
+
+    # Add candlestick chart
+    fig.add_trace(
+        go.Candlestick(
+            x=hist.index,
+            open=hist['Open'],
+            high=hist['High'],
+            low=hist['Low'],
+            close=hist['Close'],
+            name='OHLC'
+        ),
+        row=1, col=1
+    )
+
+    # Add moving averages for periods longer than 1 day
+    if period not in ["1d", "5d"]:
+        ma20, ma50 = _moving_averages(hist['Close'].to_numpy(dtype=float), (20, 50))
+
+        fig.add_trace(
+            go.Scatter(
+                x=hist.index,
+                y=ma20,
+                opacity=0.7,
+                line=dict(color='blue', width=2),
+                name='MA 20'
+            ),
+            row=1, col=1
+        )
+
+        fig.add_trace(
+            go.Scatter(
+                x=hist.index,
+                y=ma50,
+                opacity=0.7,
+                line=dict(color='orange', width=2),
+                name='MA 50'
+            ),
+            row=1, col=1
+        )
+
+    # Add volume bars
+    colors = np.where(hist['Open'].to_numpy() > hist['Close'].to_numpy(), 'red', 'green')
+    fig.add_trace(
+        go.Bar(
+            x=hist.index,
+            y=hist['Volume'],
+            marker_color=colors,
+            name='Volume'
+        ),
+        row=2, col=1
+    )
+
+    # Update layout
+    fig.update_layout(
+        height=600,
+        title=f"{symbol} Stock Price ({period})",
+        yaxis_title="Price ($)",
+        yaxis2_title="Volume",
+        showlegend=True,
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=0.01
+        ),
+        margin=dict(l=50, r=50, t=50, b=50),
+        # Keep zoom and pan state when the same symbol's chart is redrawn
+        uirevision=symbol
+    )
+
+    fig.update_xaxes(rangeslider_visible=False)
+    return fig
+
+def create_price_chart(symbol: str, period: str = "1y") -> go.Figure:
+    """Create an interactive price chart"""
+    try:
+        fig = _build_figure(symbol, period)
+
+        if fig is None:
+            st.warning(f"No data available for {symbol} in selected period")
+
+        return fig
+
+    except Exception as e:
+        st.error(f"Error creating chart: {str(e)}")
         return None
 
-class StockChartMaker:
-    @staticmethod
-    def create_price_chart(symbol: str, period: str = "1y") -> go.Figure:
-        """Create an interactive price chart"""
+# Most Yahoo Finance requests fetch_bundle keeps in flight at once
+_MAX_FETCH_WORKERS = 8
+
+def fetch_bundle(symbols: List[str], period: str = "1y", interval: str = "1d") -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch live price and history for several symbols concurrently.
+    
+    Returns a dict keyed by symbol with 'price' (None when unavailable) and
+    'history' (empty DataFrame when unavailable) entries.
+    """
+    if not symbols:
+        return {}
+
+    def fetch_history(symbol: str) -> pd.DataFrame:
         try:
-            # Define appropriate intervals for different periods
-            intervals = {
-                "1d": "1m",
-                "5d": "5m",
-                "1mo": "1h",
-                "3mo": "1d",
-                "6mo": "1d",
-                "1y": "1d",
-                "2y": "1d",
-                "5y": "1wk",
-                "max": "1mo"
-            }
-            
-            stock = yf.Ticker(symbol)
-            hist = stock.history(period=period, interval=intervals.get(period, "1d"))
-            
-            if hist.empty:
-                st.warning(f"No data available for {symbol} in selected period")
-                return None
-            
-            fig = make_subplots(
-                rows=2, cols=1,
-                shared_xaxes=True,
-                vertical_spacing=0.03,
-                row_heights=[0.7, 0.3],
-                subplot_titles=('Price', 'Volume')
-            )
-
-            # Add candlestick chart
-            fig.add_trace(
-                go.Candlestick(
-                    x=hist.index,
-                    open=hist['Open'],
-                    high=hist['High'],
-                    low=hist['Low'],
-                    close=hist['Close'],
-                    name='OHLC'
-                ),
-                row=1, col=1
-            )
-
-            # Add moving averages for periods longer than 1 day
-            if period not in ["1d", "5d"]:
-                ma20 = hist['Close'].rolling(window=20).mean()
-                ma50 = hist['Close'].rolling(window=50).mean()
-                
-                fig.add_trace(
-                    go.Scatter(
-                        x=hist.index,
-                        y=ma20,
-                        opacity=0.7,
-                        line=dict(color='blue', width=2),
-                        name='MA 20'
-                    ),
-                    row=1, col=1
-                )
-                
-                fig.add_trace(
-                    go.Scatter(
-                        x=hist.index,
-                        y=ma50,
-                        opacity=0.7,
-                        line=dict(color='orange', width=2),
-                        name='MA 50'
-                    ),
-                    row=1, col=1
-                )
+            return _fetch_history(symbol, period, interval)
+        except Exception:
+            return pd.DataFrame()
 
-            # Add volume bars
-            colors = ['red' if row['Open'] > row['Close'] else 'green' 
-                     for idx, row in hist.iterrows()]
-            fig.add_trace(
-                go.Bar(
-                    x=hist.index,
-                    y=hist['Volume'],
-                    marker_color=colors,
-                    name='Volume'
-                ),
-                row=2, col=1
-            )
-
-            # Update layout
-            fig.update_layout(
-                height=600,
-                title=f"{symbol} Stock Price ({period})",
-                yaxis_title="Price ($)",
-                yaxis2_title="Volume",
-                template="plotly_dark",
-                showlegend=True,
-                legend=dict(
-                    yanchor="top",
-                    y=0.99,
-                    xanchor="left",
-                    x=0.01
-                ),
-                margin=dict(l=50, r=50, t=50, b=50)
-            )
-
-            fig.update_xaxes(rangeslider_visible=False)
-            return fig
-            
-        except Exception as e:
-            st.error(f"Error creating chart: {str(e)}")
-            return None
+    # Workers share this session's script context so the st.cache_data lookups
+    # inside work as they do on the script thread; the threads end with the call
+    with ThreadPoolExecutor(
+        max_workers=min(_MAX_FETCH_WORKERS, 2 * len(symbols)),
+        initializer=add_script_run_ctx,
+        initargs=(None, get_script_run_ctx()),
+    ) as pool:
+        prices = pool.map(get_live_price, symbols)
+        histories = pool.map(fetch_history, symbols)
+        return {
+            symbol: {'price': price, 'history': history}
+            for symbol, price, history in zip(symbols, prices, histories)
+        }
+
+def _message_id(position: int, role: str, content: Any) -> str:
+    """Stable id for a chat message, unique even when the same content repeats"""
+    return hashlib.md5(f"{position}:{role}:{content!r}".encode()).hexdigest()
 
 class EnhancedUI:
     def __init__(self):
@@ -164,36 +312,27 @@ class EnhancedUI:
         """Display metrics in a formatted table"""
         st.subheader(title)
         
-        # Process and format the metrics
-        formatted_metrics = {}
-        for k, v in metrics.items():
-            # Format the key for display
-            display_key = k.replace('_', ' ').title()
-            
-            # Format the value based on type
-            if isinstance(v, float):
-                if 'ratio' in k.lower() or 'margin' in k.lower():
-                    formatted_metrics[display_key] = f"{v:.2f}"
-                elif 'growth' in k.lower() or 'return' in k.lower():
-                    formatted_metrics[display_key] = f"{v*100:.2f}%"
-                else:
-                    formatted_metrics[display_key] = f"{v:,.2f}"
-            else:
-                formatted_metrics[display_key] = str(v)
+        formatted_metrics = {
+            k.replace('_', ' ').title(): _format_metric(k, v)
+            for k, v in metrics.items()
+        }
         
-        # Convert to DataFrame for display
-        df = pd.DataFrame([
-            {'Metric': k, 'Value': v} 
-            for k, v in formatted_metrics.items()
-        ])
-        
-        # Display the table
-        st.dataframe(
-            df.set_index('Metric'),
-            use_container_width=True
-        )
+        # A handful of static rows, so a plain table rather than the interactive grid
+        st.table(pd.Series(formatted_metrics, name='Value').rename_axis('Metric'))
 
-    def _display_financial_analysis(self, analysis_data: Dict[str, Any], company_info: Optional[Dict[str, Any]]):
+    def _append_message(self, role: str, content: Any) -> str:
+        """Append a message to the chat history and return its id"""
+        messages = st.session_state.messages
+        message_id = _message_id(len(messages), role, content)
+        messages.append({"id": message_id, "role": role, "content": content})
+        return message_id
+
+    def _display_financial_analysis(
+        self,
+        analysis_data: Dict[str, Any],
+        company_info: Optional[Dict[str, Any]],
+        message_id: str = ""
+    ):
         """Display financial analysis in a structured format"""
         try:
             # Check if we have valid data
@@ -206,9 +345,8 @@ class EnhancedUI:
             if symbol:
                 st.session_state.last_symbol = symbol
                 
-                # Create a container for live price and chart
-                price_container = st.container()
-                self._display_live_price(symbol, price_container)
+                # Live price and chart rerun on their own when the period changes
+                self._price_and_chart_fragment(symbol, message_id)
             
             # Company Header with error handling
             company_name = company_info.get('name', 'Unknown Company')
@@ -280,14 +418,13 @@ class EnhancedUI:
             st.write("Analysis Data:", analysis_data)
             st.write("Company Info:", company_info)
 
-    def _display_live_price(self, symbol: str, display_container=None):
-        """Display live price information"""
-        container = display_container if display_container is not None else st
-        
-        price_data = StockPriceTracker.get_live_price(symbol)
+    @st.fragment
+    def _price_and_chart_fragment(self, symbol: str, message_id: str = ""):
+        """Display live price information and the price chart"""
+        price_data = get_live_price(symbol)
         if price_data:
             # Create main columns: metrics and period selector
-            metric_cols = container.columns([5, 1])
+            metric_cols = st.columns([5, 1])
             
             with metric_cols[0]:
                 cols = st.columns(5)
@@ -308,15 +445,14 @@ class EnhancedUI:
                         f"{price_data['volume']:,.0f}"
                     )
                 with cols[4]:
-                    stock = yf.Ticker(symbol)
-                    if 'marketCap' in stock.info:
-                        market_cap = stock.info['marketCap']
-                        market_cap_str = (
-                            f"${market_cap/1e12:.2f}T" if market_cap >= 1e12 else
-                            f"${market_cap/1e9:.2f}B" if market_cap >= 1e9 else
-                            f"${market_cap/1e6:.2f}M"
-                        )
-                        st.metric("Market Cap", market_cap_str)
+                    # fast_info reads market cap from price data instead of the full info payload
+                    try:
+                        market_cap = _get_ticker(symbol).fast_info.get('marketCap')
+                    except Exception:
+                        market_cap = None
+                    # fast_info computes shares * last price, which is NaN when either is missing
+                    if market_cap is not None and market_cap == market_cap and market_cap > 0:
+                        st.metric("Market Cap", _format_market_cap(market_cap))
             
             with metric_cols[1]:
                 if f'period_{symbol}' not in st.session_state:
@@ -324,22 +460,51 @@ class EnhancedUI:
                 
                 period = st.selectbox(
                     "Period",
-                    ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "max"],
-                    index=["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "max"].index(
-                        st.session_state[f'period_{symbol}']
-                    ),
-                    key=f"period_selector_{symbol}"
+                    _PERIODS,
+                    index=_PERIODS.index(st.session_state[f'period_{symbol}']),
+                    # Keyed per message so the same symbol can appear in several messages
+                    key=f"period_selector_{symbol}_{message_id}"
                 )
                 
                 st.session_state[f'period_{symbol}'] = period
 
             # Create and display chart
             if period:
-                chart = StockChartMaker.create_price_chart(symbol, period)
+                chart = create_price_chart(symbol, period)
                 if chart:
-                    container.plotly_chart(chart, use_container_width=True)
+                    st.plotly_chart(chart, use_container_width=True)
+
+    @st.fragment
+    def _display_chat_history(self):
+        """
+        Display previous chat messages.
+        
+        Runs as a fragment so that widgets inside past messages (such as chart
+        period selectors) rerun only the history, not the whole app.
+        """
+        for position, msg in enumerate(st.session_state.messages):
+            # Messages stored before ids existed get one derived the same way
+            message_id = msg.setdefault("id", _message_id(position, msg["role"], msg["content"]))
+            with st.chat_message(msg["role"]):
+                if msg["role"] == "assistant":
+                    if isinstance(msg["content"], dict) and "analysis_data" in msg["content"]:
+                        self._display_financial_analysis(
+                            msg["content"]["analysis_data"],
+                            msg["content"]["company_info"],
+                            message_id
+                        )
+                        st.markdown(msg["content"]["response"])
+                    else:
+                        st.markdown(msg["content"])
+                else:
+                    st.markdown(msg["content"])
 
-    def render(self, agent: Any, process_message: Callable, model_name: str):
+    def render(
+        self,
+        agent: Any,
+        process_message: Callable[[Any, str, Dict[str, Any]], AsyncIterator[str]],
+        model_name: str
+    ):
         """Render the chat interface"""
         # Add custom CSS
         st.markdown("""
@@ -382,23 +547,11 @@ class EnhancedUI:
         """, unsafe_allow_html=True)
 
         # Display chat history
-        for msg in st.session_state.messages:
-            with st.chat_message(msg["role"]):
-                if msg["role"] == "assistant":
-                    if isinstance(msg["content"], dict) and "analysis_data" in msg["content"]:
-                        self._display_financial_analysis(
-                            msg["content"]["analysis_data"],
-                            msg["content"]["company_info"]
-                        )
-                        st.markdown(msg["content"]["response"])
-                    else:
-                        st.markdown(msg["content"])
-                else:
-                    st.markdown(msg["content"])
+        self._display_chat_history()
 
         # Chat input
         if prompt := st.chat_input("What would you like to know?"):
-            st.session_state.messages.append({"role": "user", "content": prompt})
+            self._append_message("user", prompt)
             
             with st.chat_message("user"):
                 st.markdown(prompt)
@@ -414,30 +567,36 @@ class EnhancedUI:
                 )
                 
                 try:
-                    response = asyncio.run(process_message(agent, prompt))
+                    # Stream on the shared loop so HTTP connection pools survive between messages
+                    context: Dict[str, Any] = {}
+                    response_text = message_placeholder.write_stream(
+                        _iter_async(process_message(agent, prompt, context))
+                    )
                     status_container.status("Done!", state="complete", expanded=False)
                     
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": response
-                    })
+                    # Agents that produce structured analysis leave it in the context
+                    if "analysis" in context:
+                        response = {
+                            "response": response_text,
+                            "analysis_data": context["analysis"],
+                            "company_info": context.get("company_info")
+                        }
+                    else:
+                        response = response_text
+                    
+                    message_id = self._append_message("assistant", response)
                     
                     status_container.empty()
                     
                     if isinstance(response, dict) and "analysis_data" in response:
                         self._display_financial_analysis(
                             response["analysis_data"],
-                            response["company_info"]
+                            response["company_info"],
+                            message_id
                         )
-                        message_placeholder.markdown(response["response"])
-                    else:
-                        message_placeholder.markdown(response)
                 
                 except Exception as e:
                     error_msg = f"Error processing request: {str(e)}"
                     status_container.status("Error occurred", state="error")
                     message_placeholder.error(error_msg)
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": error_msg
-                    })
\ No newline at end of file
+                    self._append_message("assistant", error_msg)
\ No newline at end of file
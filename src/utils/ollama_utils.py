@@ -1,36 +1,36 @@
-import subprocess
-from typing import List
+from typing import Tuple
+import httpx
 import streamlit as st
 
-def get_ollama_models() -> List[str]:
+from src.config import settings
+
+# cache_resource hands every session the same tuple instead of unpickling a fresh copy
+@st.cache_resource(ttl=300, show_spinner=False)
+def _fetch_ollama_models() -> Tuple[str, ...]:
+    # The native API lives at the server root, not under the OpenAI-compatible /v1 path
+    base_url = settings.OLLAMA_BASE_URL.rstrip('/').removesuffix('/v1')
+    r = httpx.get(f"{base_url}/api/tags", timeout=2.0)
+    r.raise_for_status()
+    return tuple(m['name'] for m in r.json().get('models', []))
+
+def get_ollama_models() -> Tuple[str, ...]:
     """
     Fetch list of available Ollama models.
     
+    Results are shared across sessions for 5 minutes; failed lookups are not cached.
+    
     Returns:
-        List of model names or empty list if no models found.
+        Tuple of model names or empty tuple if no models found.
     """
     try:
-        # Use subprocess to run Ollama list command
-        result = subprocess.run(
-            ['ollama', 'list'], 
-            capture_output=True, 
-            text=True, 
-            check=True
-        )
-        
-        # Parse the output and extract model names
-        models = []
-        for line in result.stdout.split('\n')[1:]:  # Skip header
-            if line.strip():
-                # Split the line and take the first column (model name)
-                model_name = line.split()[0]
-                models.append(model_name)
-        
-        return models
+        return _fetch_ollama_models()
+    except httpx.ConnectError:
+        return ()
     except Exception as e:
         st.error(f"Error fetching Ollama models: {e}")
-        return []
+        return ()
 
+@st.cache_resource(show_spinner=False)
 def create_ollama_client(model_name: str):
     """
     Create an Ollama client for the selected model.
@@ -42,7 +42,6 @@ def create_ollama_client(model_name: str):
         AsyncOpenAI client configured for Ollama
     """
     from openai import AsyncOpenAI
-    from src.config import settings
 
     return AsyncOpenAI(
         base_url=settings.OLLAMA_BASE_URL,